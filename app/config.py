@@ -88,6 +88,13 @@ class Settings:
     db_tables_denylist: list[str]
     max_result_rows: int
 
+    pipeline_workers: int
+    sql_candidates: int
+    sql_repair_attempts: int
+    sql_dry_run: bool
+    sql_generation_timeout_seconds: float
+    sql_candidate_temperature: float
+
     schema_cache_ttl_seconds: int
     schema_max_tables: int
     schema_max_columns: int
@@ -98,6 +105,7 @@ class Settings:
     ollama_embedding_model: str
     ollama_timeout_seconds: int
     ollama_temperature: float
+    ollama_keep_alive: str
 
     rag_enabled: bool
     rag_store_path: str
@@ -105,6 +113,28 @@ class Settings:
     rag_max_chunk_chars: int
 
     memory_max_messages: int
+    memory_backend: str
+    memory_sqlite_path: str
+    memory_max_sessions: int
+    memory_session_ttl_seconds: int
+    memory_max_bytes: int
+
+    batch_concurrency: int
+    batch_max_concurrency: int
+    batch_max_items: int
+
+    followup_fast_path: bool
+    followup_max_words: int
+
+    metrics_enabled: bool
+
+    prewarm_enabled: bool
+    prewarm_blocking: bool
+    prewarm_schema: bool
+    prewarm_vector_store: bool
+    prewarm_models: bool
+    prewarm_retry_seconds: float
+    prewarm_retry_max_seconds: float
 
     @classmethod
     def load(cls) -> "Settings":
@@ -130,6 +160,12 @@ class Settings:
             db_tables_allowlist=_env_csv("DB_TABLES_ALLOWLIST"),
             db_tables_denylist=_env_csv("DB_TABLES_DENYLIST"),
             max_result_rows=_env_int("MAX_RESULT_ROWS", 200),
+            pipeline_workers=max(1, _env_int("PIPELINE_WORKERS", 16)),
+            sql_candidates=max(1, _env_int("SQL_CANDIDATES", 1)),
+            sql_repair_attempts=max(0, _env_int("SQL_REPAIR_ATTEMPTS", 1)),
+            sql_dry_run=_env_bool("SQL_DRY_RUN", True),
+            sql_generation_timeout_seconds=_env_float("SQL_GENERATION_TIMEOUT_SECONDS", 60.0),
+            sql_candidate_temperature=_env_float("SQL_CANDIDATE_TEMPERATURE", 0.7),
             schema_cache_ttl_seconds=_env_int("SCHEMA_CACHE_TTL_SECONDS", 300),
             schema_max_tables=_env_int("SCHEMA_MAX_TABLES", 200),
             schema_max_columns=_env_int("SCHEMA_MAX_COLUMNS", 40),
@@ -139,11 +175,30 @@ class Settings:
             ollama_embedding_model=_env("OLLAMA_EMBEDDING_MODEL", "nomic-embed-text"),
             ollama_timeout_seconds=_env_int("OLLAMA_TIMEOUT_SECONDS", 120),
             ollama_temperature=_env_float("OLLAMA_TEMPERATURE", 0.2),
+            ollama_keep_alive=_env("OLLAMA_KEEP_ALIVE", "") or "",
             rag_enabled=_env_bool("RAG_ENABLED", False),
             rag_store_path=_env("RAG_STORE_PATH", "./rag_store.json"),
             rag_top_k=_env_int("RAG_TOP_K", 4),
             rag_max_chunk_chars=_env_int("RAG_MAX_CHUNK_CHARS", 1000),
             memory_max_messages=_env_int("MEMORY_MAX_MESSAGES", 12),
+            memory_backend=(_env("MEMORY_BACKEND", "memory") or "memory").strip().lower(),
+            memory_sqlite_path=_env("MEMORY_SQLITE_PATH", "./memory.db"),
+            memory_max_sessions=_env_int("MEMORY_MAX_SESSIONS", 10000),
+            memory_session_ttl_seconds=_env_int("MEMORY_SESSION_TTL_SECONDS", 3600),
+            memory_max_bytes=_env_int("MEMORY_MAX_BYTES", 64 * 1024 * 1024),
+            batch_concurrency=max(1, _env_int("BATCH_CONCURRENCY", 4)),
+            batch_max_concurrency=max(1, _env_int("BATCH_MAX_CONCURRENCY", 16)),
+            batch_max_items=max(1, _env_int("BATCH_MAX_ITEMS", 500)),
+            followup_fast_path=_env_bool("FOLLOWUP_FAST_PATH", True),
+            followup_max_words=_env_int("FOLLOWUP_MAX_WORDS", 12),
+            metrics_enabled=_env_bool("METRICS_ENABLED", True),
+            prewarm_enabled=_env_bool("PREWARM_ENABLED", True),
+            prewarm_blocking=_env_bool("PREWARM_BLOCKING", False),
+            prewarm_schema=_env_bool("PREWARM_SCHEMA", True),
+            prewarm_vector_store=_env_bool("PREWARM_VECTOR_STORE", True),
+            prewarm_models=_env_bool("PREWARM_MODELS", True),
+            prewarm_retry_seconds=_env_float("PREWARM_RETRY_SECONDS", 1.0),
+            prewarm_retry_max_seconds=_env_float("PREWARM_RETRY_MAX_SECONDS", 30.0),
         )
 
 
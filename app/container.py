@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable
+
+from app.config import settings
+from app.llm import OllamaClient
+from app.pipeline import ChatPipeline
+from app.schema import schema_catalog
+
+
+class AppContainer:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._ollama_client: OllamaClient | None = None
+        self._pipeline: ChatPipeline | None = None
+        self._steps: dict[str, dict[str, Any]] = {}
+        self._prewarm_started = False
+        self._prewarm_done = False
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def ollama_client(self) -> OllamaClient:
+        if self._ollama_client is None:
+            with self._build_lock:
+                if self._ollama_client is None:
+                    self._ollama_client = OllamaClient()
+        return self._ollama_client
+
+    @property
+    def pipeline(self) -> ChatPipeline:
+        if self._pipeline is None:
+            client = self.ollama_client
+            with self._build_lock:
+                if self._pipeline is None:
+                    self._pipeline = ChatPipeline(ollama_client=client)
+        return self._pipeline
+
+    def _load_vector_store(self) -> None:
+        if self.pipeline.rag_store:
+            self.pipeline.rag_store.load()
+
+    def _prewarm_steps(self) -> dict[str, Callable[[], Any]]:
+        steps: dict[str, Callable[[], Any]] = {"pipeline": lambda: self.pipeline}
+        if settings.prewarm_schema:
+            steps["schema"] = schema_catalog.get
+        if settings.prewarm_vector_store and settings.rag_enabled:
+            steps["vector_store"] = self._load_vector_store
+        if settings.prewarm_models:
+            steps["chat_model"] = lambda: self.ollama_client.preload()
+            if settings.rag_enabled:
+                steps["embedding_model"] = lambda: self.ollama_client.preload_embeddings()
+        return steps
+
+    def _run_steps(self, steps: dict[str, Callable[[], Any]]) -> list[str]:
+        failed: list[str] = []
+        for name, step in steps.items():
+            with self._lock:
+                if self._steps.get(name, {}).get("warm"):
+                    continue
+                attempts = self._steps.get(name, {}).get("attempts", 0) + 1
+            started = time.perf_counter()
+            entry: dict[str, Any] = {"warm": False, "attempts": attempts}
+            try:
+                step()
+                entry["warm"] = True
+            except Exception as exc:
+                entry["error"] = str(exc)
+                failed.append(name)
+            entry["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            with self._lock:
+                if not self._steps.get(name, {}).get("warm"):
+                    self._steps[name] = entry
+        return failed
+
+    def _retry(self, steps: dict[str, Callable[[], Any]], failed: list[str]) -> None:
+        delay = settings.prewarm_retry_seconds
+        while failed and not self._stopping.wait(delay):
+            failed = self._run_steps({name: steps[name] for name in failed})
+            delay = min(delay * 2, settings.prewarm_retry_max_seconds)
+
+    def prewarm(self, retry: bool = True) -> list[str]:
+        with self._lock:
+            if self._prewarm_started:
+                return []
+            self._prewarm_started = True
+        steps = self._prewarm_steps()
+        with self._lock:
+            for name in steps:
+                self._steps.setdefault(name, {"warm": False, "attempts": 0})
+        failed = self._run_steps(steps)
+        with self._lock:
+            self._prewarm_done = True
+        if retry:
+            self._retry(steps, failed)
+        return failed
+
+    def _start_retry(self, failed: list[str]) -> None:
+        steps = self._prewarm_steps()
+        self._thread = threading.Thread(target=self._retry, args=(steps, failed), name="prewarm", daemon=True)
+        self._thread.start()
+
+    def start(self) -> None:
+        if not settings.prewarm_enabled:
+            return
+        if settings.prewarm_blocking:
+            failed = self.prewarm(retry=False)
+            if failed:
+                self._start_retry(failed)
+            return
+        self._thread = threading.Thread(target=self.prewarm, name="prewarm", daemon=True)
+        self._thread.start()
+
+    def mark_warm(self) -> None:
+        with self._lock:
+            for entry in self._steps.values():
+                if not entry.get("warm"):
+                    entry["warm"] = True
+                    entry.pop("error", None)
+
+    def shutdown(self) -> None:
+        self._stopping.set()
+        if self._pipeline is not None:
+            self._pipeline.close()
+
+    def status(self) -> dict[str, Any]:
+        with self._lock:
+            steps = {name: dict(entry) for name, entry in self._steps.items()}
+            done = self._prewarm_done or not settings.prewarm_enabled
+        ready = done and all(entry.get("warm") for entry in steps.values())
+        return {"ready": ready, "prewarm_done": done, "steps": steps}
+
+
+container = AppContainer()
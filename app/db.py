@@ -5,8 +5,10 @@ from typing import Any
 
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError, StatementError
 
 from app.config import settings
+from app.metrics import DB_POOL, metrics
 
 
 @lru_cache(maxsize=1)
@@ -14,6 +16,19 @@ def get_engine() -> Engine:
     return create_engine(settings.db_url, pool_pre_ping=True)
 
 
+def _collect_pool_metrics() -> None:
+    if not get_engine.cache_info().currsize:
+        return
+    pool = get_engine().pool
+    for state in ("size", "checkedin", "checkedout", "overflow"):
+        reader = getattr(pool, state, None)
+        if callable(reader):
+            DB_POOL.set(reader(), state=state)
+
+
+metrics.register_collector(_collect_pool_metrics)
+
+
 def run_query(sql: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
     engine = get_engine()
     with engine.connect() as connection:
@@ -22,3 +37,27 @@ def run_query(sql: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
         columns = list(result.keys())
     data = [dict(zip(columns, row)) for row in rows]
     return {"columns": columns, "rows": data}
+
+
+_EXPLAIN_PREFIXES = {
+    "sqlite": "EXPLAIN QUERY PLAN",
+    "postgresql": "EXPLAIN",
+    "mysql": "EXPLAIN",
+    "mariadb": "EXPLAIN",
+}
+
+
+def is_statement_error(exc: SQLAlchemyError) -> bool:
+    """True when the database rejected the statement, not when it could not be reached."""
+    if not isinstance(exc, StatementError) or exc.statement is None:
+        return False
+    return not getattr(exc, "connection_invalidated", False)
+
+
+def explain_query(sql: str) -> None:
+    engine = get_engine()
+    prefix = _EXPLAIN_PREFIXES.get(engine.dialect.name)
+    if prefix is None:
+        return
+    with engine.connect() as connection:
+        connection.execute(text(f"{prefix} {sql}")).fetchall()
@@ -1,11 +1,21 @@
 from __future__ import annotations
 
 import json
+import time
 from typing import Any
 
 import requests
 
 from app.config import settings
+from app.metrics import (
+    LLM_EVAL_SECONDS,
+    LLM_PROMPT_CHARS,
+    LLM_PROMPT_EVAL_SECONDS,
+    LLM_REQUEST_SECONDS,
+    LLM_RESPONSE_CHARS,
+    LLM_TOKENS,
+    metrics,
+)
 
 
 class OllamaClient:
@@ -14,40 +24,87 @@ class OllamaClient:
         self.model = settings.ollama_model
         self.embedding_model = settings.ollama_embedding_model
 
+    def _post(self, endpoint: str, payload: dict[str, Any], prompt_chars: int) -> requests.Response:
+        started = time.perf_counter()
+        try:
+            return requests.post(
+                f"{self.base_url}/api/{endpoint}",
+                json=payload,
+                timeout=settings.ollama_timeout_seconds,
+            )
+        finally:
+            if metrics.enabled:
+                LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, model=payload["model"])
+                LLM_PROMPT_CHARS.observe(prompt_chars, endpoint=endpoint)
+
+    @staticmethod
+    def _record_eval(data: dict[str, Any], model: str) -> None:
+        if not metrics.enabled:
+            return
+        if "eval_duration" in data:
+            LLM_EVAL_SECONDS.observe(data["eval_duration"] / 1e9, model=model)
+        if "prompt_eval_duration" in data:
+            LLM_PROMPT_EVAL_SECONDS.observe(data["prompt_eval_duration"] / 1e9, model=model)
+        if "eval_count" in data:
+            LLM_TOKENS.inc(data["eval_count"], model=model, kind="eval")
+        if "prompt_eval_count" in data:
+            LLM_TOKENS.inc(data["prompt_eval_count"], model=model, kind="prompt_eval")
+
     def chat(self, messages: list[dict[str, str]], temperature: float | None = None) -> str:
         payload = {
             "model": self.model,
             "messages": messages,
             "stream": False,
-            "options": {"temperature": temperature or settings.ollama_temperature},
+            "options": {"temperature": settings.ollama_temperature if temperature is None else temperature},
         }
-        response = requests.post(
-            f"{self.base_url}/api/chat",
-            json=payload,
-            timeout=settings.ollama_timeout_seconds,
-        )
+        if settings.ollama_keep_alive:
+            payload["keep_alive"] = settings.ollama_keep_alive
+        prompt_chars = sum(len(message.get("content", "")) for message in messages)
+        response = self._post("chat", payload, prompt_chars)
         response.raise_for_status()
         data = response.json()
+        self._record_eval(data, self.model)
         message = data.get("message", {})
-        return message.get("content", "").strip()
+        content = message.get("content", "").strip()
+        LLM_RESPONSE_CHARS.observe(len(content), endpoint="chat")
+        return content
 
     def embed(self, text: str) -> list[float]:
-        payload = {"model": self.embedding_model, "prompt": text}
-        response = requests.post(
-            f"{self.base_url}/api/embeddings",
-            json=payload,
-            timeout=settings.ollama_timeout_seconds,
-        )
+        payload: dict[str, Any] = {"model": self.embedding_model, "prompt": text}
+        if settings.ollama_keep_alive:
+            payload["keep_alive"] = settings.ollama_keep_alive
+        response = self._post("embeddings", payload, len(text))
         response.raise_for_status()
         data = response.json()
         return data.get("embedding", [])
 
+    def embed_many(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        payload: dict[str, Any] = {"model": self.embedding_model, "input": texts}
+        if settings.ollama_keep_alive:
+            payload["keep_alive"] = settings.ollama_keep_alive
+        response = self._post("embed", payload, sum(len(text) for text in texts))
+        if response.status_code == 404:
+            return [self.embed(text) for text in texts]
+        response.raise_for_status()
+        data = response.json()
+        self._record_eval(data, self.embedding_model)
+        return data.get("embeddings", [])
+
+    def preload(self) -> None:
+        payload: dict[str, Any] = {"model": self.model}
+        if settings.ollama_keep_alive:
+            payload["keep_alive"] = settings.ollama_keep_alive
+        response = self._post("generate", payload, 0)
+        response.raise_for_status()
+
+    def preload_embeddings(self) -> None:
+        self.embed_many(["warmup"])
+
     @staticmethod
     def safe_json(text: str) -> dict[str, Any]:
         try:
             return json.loads(text)
         except json.JSONDecodeError:
             return {}
-
-
-ollama_client = OllamaClient()
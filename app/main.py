@@ -1,16 +1,30 @@
 from __future__ import annotations
 
-from typing import Any, Optional
+import json
+from contextlib import asynccontextmanager
+from typing import Annotated, Any, AsyncIterator, Iterator, Optional
 
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
 from app.config import settings
-from app.pipeline import pipeline
+from app.container import container
+from app.metrics import metrics
 from app.schema import schema_catalog
 
 
-app = FastAPI(title=settings.app_name)
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    app.state.container = container
+    await run_in_threadpool(container.start)
+    yield
+    container.shutdown()
+
+
+app = FastAPI(title=settings.app_name, lifespan=lifespan)
 
 
 class ChatRequest(BaseModel):
@@ -26,6 +40,27 @@ class ChatResponse(BaseModel):
     debug: Optional[dict[str, Any]] = None
 
 
+class BatchChatRequest(BaseModel):
+    questions: list[Annotated[str, Field(min_length=1)]] = Field(..., min_length=1)
+    concurrency: Optional[int] = Field(default=None, ge=1)
+    include_debug: bool = False
+    stream: bool = False
+
+
+class BatchChatItem(BaseModel):
+    index: int
+    question: str
+    answer: Optional[str] = None
+    sql: Optional[str] = None
+    data: Optional[dict[str, Any]] = None
+    error: Optional[str] = None
+    debug: Optional[dict[str, Any]] = None
+
+
+class BatchChatResponse(BaseModel):
+    results: list[BatchChatItem]
+
+
 class RAGIngestRequest(BaseModel):
     doc_id: str = Field(..., min_length=1)
     text: str = Field(..., min_length=1)
@@ -37,6 +72,19 @@ def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/ready")
+def ready() -> JSONResponse:
+    status = container.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint() -> PlainTextResponse:
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled.")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/schema")
 def schema_summary() -> dict[str, Any]:
     catalog = schema_catalog.get()
@@ -48,12 +96,18 @@ def schema_summary() -> dict[str, Any]:
     }
 
 
+@app.get("/memory/stats")
+def memory_stats() -> dict[str, Any]:
+    return container.pipeline.memory.stats()
+
+
 @app.post("/chat", response_model=ChatResponse)
 def chat(request: ChatRequest) -> ChatResponse:
     try:
-        result = pipeline.run(request.question, session_id=request.session_id)
+        result = container.pipeline.run(request.question, session_id=request.session_id)
     except Exception as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    container.mark_warm()
     return ChatResponse(
         answer=result.answer,
         sql=result.sql,
@@ -62,9 +116,34 @@ def chat(request: ChatRequest) -> ChatResponse:
     )
 
 
+def _batch_items(request: BatchChatRequest) -> Iterator[BatchChatItem]:
+    for index, result, error in container.pipeline.run_batch(request.questions, request.concurrency):
+        item = BatchChatItem(index=index, question=request.questions[index], error=error)
+        if result is not None:
+            item.answer = result.answer
+            item.sql = result.sql
+            item.data = result.data
+            item.debug = result.debug if request.include_debug else None
+        yield item
+
+
+@app.post("/chat/batch", response_model=BatchChatResponse)
+def chat_batch(request: BatchChatRequest) -> BatchChatResponse | StreamingResponse:
+    if len(request.questions) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch exceeds {settings.batch_max_items} questions.",
+        )
+    if request.stream:
+        lines = (json.dumps(jsonable_encoder(item)) + "\n" for item in _batch_items(request))
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+    results = sorted(_batch_items(request), key=lambda item: item.index)
+    return BatchChatResponse(results=results)
+
+
 @app.post("/rag/ingest")
 def rag_ingest(request: RAGIngestRequest) -> dict[str, str]:
     if not settings.rag_enabled:
         raise HTTPException(status_code=400, detail="RAG is disabled.")
-    pipeline.ingest_document(request.doc_id, request.text, request.metadata)
+    container.pipeline.ingest_document(request.doc_id, request.text, request.metadata)
     return {"status": "ok"}
@@ -1,24 +1,424 @@
 from __future__ import annotations
 
-from collections import defaultdict, deque
-from typing import Deque
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, Deque, Protocol
 
 from app.config import settings
 
 
+def _message_size(role: str, content: str) -> int:
+    return len(role.encode("utf-8")) + len(content.encode("utf-8"))
+
+
+class MemoryBackend(Protocol):
+    def add(self, session_id: str, role: str, content: str) -> None:
+        raise NotImplementedError
+
+    def get(self, session_id: str) -> list[dict[str, str]]:
+        raise NotImplementedError
+
+    def get_plan(self, session_id: str) -> dict[str, Any] | None:
+        raise NotImplementedError
+
+    def set_plan(self, session_id: str, plan: dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> dict[str, Any]:
+        raise NotImplementedError
+
+
+class _Session:
+    __slots__ = ("messages", "plan", "size", "last_access")
+
+    def __init__(self) -> None:
+        self.messages: Deque[dict[str, str]] = deque()
+        self.plan: str | None = None
+        self.size = 0
+        self.last_access = time.monotonic()
+
+
+class InMemoryBackend:
+    def __init__(
+        self,
+        max_messages: int,
+        max_sessions: int,
+        ttl_seconds: int,
+        max_bytes: int,
+    ) -> None:
+        self.max_messages = max_messages
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._sessions: OrderedDict[str, _Session] = OrderedDict()
+        self._bytes = 0
+        self._evictions = {"lru": 0, "ttl": 0, "bytes": 0}
+        self._lock = threading.Lock()
+
+    def _drop(self, session_id: str, reason: str) -> None:
+        session = self._sessions.pop(session_id)
+        self._bytes -= session.size
+        self._evictions[reason] += 1
+
+    def _expire(self, now: float) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_access < self.ttl_seconds:
+                break
+            self._drop(session_id, "ttl")
+
+    def _enforce_limits(self, keep: str) -> None:
+        while self.max_sessions > 0 and len(self._sessions) > self.max_sessions:
+            self._drop(next(iter(self._sessions)), "lru")
+        while self.max_bytes > 0 and self._bytes > self.max_bytes and len(self._sessions) > 1:
+            oldest = next(iter(self._sessions))
+            if oldest == keep:
+                break
+            self._drop(oldest, "bytes")
+        session = self._sessions.get(keep)
+        while session and self.max_bytes > 0 and self._bytes > self.max_bytes and len(session.messages) > 1:
+            message = session.messages.popleft()
+            size = _message_size(message["role"], message["content"])
+            session.size -= size
+            self._bytes -= size
+
+    def _touch(self, session_id: str) -> _Session:
+        now = time.monotonic()
+        self._expire(now)
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = _Session()
+            self._sessions[session_id] = session
+        else:
+            self._sessions.move_to_end(session_id)
+        session.last_access = now
+        return session
+
+    def add(self, session_id: str, role: str, content: str) -> None:
+        with self._lock:
+            session = self._touch(session_id)
+            session.messages.append({"role": role, "content": content})
+            size = _message_size(role, content)
+            session.size += size
+            self._bytes += size
+            while len(session.messages) > self.max_messages:
+                dropped = session.messages.popleft()
+                dropped_size = _message_size(dropped["role"], dropped["content"])
+                session.size -= dropped_size
+                self._bytes -= dropped_size
+            self._enforce_limits(session_id)
+
+    def get(self, session_id: str) -> list[dict[str, str]]:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                return []
+            self._sessions.move_to_end(session_id)
+            session.last_access = now
+            return list(session.messages)
+
+    def get_plan(self, session_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            self._expire(time.monotonic())
+            session = self._sessions.get(session_id)
+            if session is None or session.plan is None:
+                return None
+            return json.loads(session.plan)
+
+    def set_plan(self, session_id: str, plan: dict[str, Any]) -> None:
+        encoded = json.dumps(plan, ensure_ascii=True)
+        with self._lock:
+            session = self._touch(session_id)
+            previous = len(session.plan) if session.plan else 0
+            session.plan = encoded
+            session.size += len(encoded) - previous
+            self._bytes += len(encoded) - previous
+            self._enforce_limits(session_id)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "messages": sum(len(session.messages) for session in self._sessions.values()),
+                "bytes": self._bytes,
+                "evictions": dict(self._evictions),
+            }
+
+
+class SQLiteMemoryBackend:
+    def __init__(
+        self,
+        path: str,
+        max_messages: int,
+        max_sessions: int,
+        ttl_seconds: int,
+        max_bytes: int,
+    ) -> None:
+        self.path = Path(path)
+        self.max_messages = max_messages
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS memory_sessions (
+                    session_id TEXT PRIMARY KEY,
+                    last_access REAL NOT NULL,
+                    size INTEGER NOT NULL DEFAULT 0,
+                    plan TEXT
+                );
+                CREATE INDEX IF NOT EXISTS memory_sessions_last_access
+                    ON memory_sessions (last_access);
+                CREATE TABLE IF NOT EXISTS memory_messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    size INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS memory_messages_session
+                    ON memory_messages (session_id, id);
+                CREATE TABLE IF NOT EXISTS memory_evictions (
+                    reason TEXT PRIMARY KEY,
+                    count INTEGER NOT NULL DEFAULT 0
+                );
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _delete_sessions(self, connection: sqlite3.Connection, session_ids: list[str], reason: str) -> None:
+        if not session_ids:
+            return
+        placeholders = ", ".join("?" for _ in session_ids)
+        connection.execute(f"DELETE FROM memory_messages WHERE session_id IN ({placeholders})", session_ids)
+        connection.execute(f"DELETE FROM memory_sessions WHERE session_id IN ({placeholders})", session_ids)
+        connection.execute(
+            "INSERT INTO memory_evictions (reason, count) VALUES (?, ?) "
+            "ON CONFLICT (reason) DO UPDATE SET count = count + excluded.count",
+            (reason, len(session_ids)),
+        )
+
+    def _expire(self, connection: sqlite3.Connection, now: float) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        rows = connection.execute(
+            "SELECT session_id FROM memory_sessions WHERE last_access < ?",
+            (now - self.ttl_seconds,),
+        ).fetchall()
+        self._delete_sessions(connection, [row[0] for row in rows], "ttl")
+
+    def _enforce_limits(self, connection: sqlite3.Connection, keep: str) -> None:
+        if self.max_sessions > 0:
+            rows = connection.execute(
+                "SELECT session_id FROM memory_sessions WHERE session_id != ? "
+                "ORDER BY last_access DESC LIMIT -1 OFFSET ?",
+                (keep, max(self.max_sessions - 1, 0)),
+            ).fetchall()
+            self._delete_sessions(connection, [row[0] for row in rows], "lru")
+        if self.max_bytes > 0:
+            total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM memory_sessions").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            victims: list[str] = []
+            rows = connection.execute(
+                "SELECT session_id, size FROM memory_sessions WHERE session_id != ? ORDER BY last_access",
+                (keep,),
+            )
+            for session_id, size in rows:
+                if total <= self.max_bytes:
+                    break
+                victims.append(session_id)
+                total -= size
+            self._delete_sessions(connection, victims, "bytes")
+            if total <= self.max_bytes:
+                return
+            messages = connection.execute(
+                "SELECT id, size FROM memory_messages WHERE session_id = ? ORDER BY id",
+                (keep,),
+            ).fetchall()
+            trimmed: list[int] = []
+            for message_id, size in messages[:-1]:
+                if total <= self.max_bytes:
+                    break
+                trimmed.append(message_id)
+                total -= size
+            if trimmed:
+                placeholders = ", ".join("?" for _ in trimmed)
+                connection.execute(f"DELETE FROM memory_messages WHERE id IN ({placeholders})", trimmed)
+                connection.execute(
+                    "UPDATE memory_sessions SET size = "
+                    "(SELECT COALESCE(SUM(size), 0) FROM memory_messages WHERE session_id = ?) "
+                    "+ COALESCE(LENGTH(plan), 0) WHERE session_id = ?",
+                    (keep, keep),
+                )
+
+    def add(self, session_id: str, role: str, content: str) -> None:
+        now = time.time()
+        size = _message_size(role, content)
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            self._expire(connection, now)
+            connection.execute(
+                "INSERT INTO memory_messages (session_id, role, content, size) VALUES (?, ?, ?, ?)",
+                (session_id, role, content, size),
+            )
+            connection.execute(
+                "DELETE FROM memory_messages WHERE session_id = ? AND id NOT IN "
+                "(SELECT id FROM memory_messages WHERE session_id = ? ORDER BY id DESC LIMIT ?)",
+                (session_id, session_id, self.max_messages),
+            )
+            self._update_session(connection, session_id, now)
+            self._enforce_limits(connection, session_id)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def _update_session(
+        self,
+        connection: sqlite3.Connection,
+        session_id: str,
+        now: float,
+        plan: str | None = None,
+    ) -> None:
+        message_size = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM memory_messages WHERE session_id = ?",
+            (session_id,),
+        ).fetchone()[0]
+        connection.execute(
+            "INSERT INTO memory_sessions (session_id, last_access, size, plan) VALUES (?, ?, 0, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET last_access = excluded.last_access, "
+            "plan = COALESCE(excluded.plan, memory_sessions.plan)",
+            (session_id, now, plan),
+        )
+        connection.execute(
+            "UPDATE memory_sessions SET size = ? + COALESCE(LENGTH(plan), 0) WHERE session_id = ?",
+            (message_size, session_id),
+        )
+
+    def get(self, session_id: str) -> list[dict[str, str]]:
+        now = time.time()
+        connection = self._connect()
+        row = connection.execute(
+            "SELECT last_access FROM memory_sessions WHERE session_id = ?",
+            (session_id,),
+        ).fetchone()
+        if row is None:
+            return []
+        if self.ttl_seconds > 0 and now - row[0] >= self.ttl_seconds:
+            return []
+        connection.execute(
+            "UPDATE memory_sessions SET last_access = ? WHERE session_id = ?",
+            (now, session_id),
+        )
+        rows = connection.execute(
+            "SELECT role, content FROM memory_messages WHERE session_id = ? ORDER BY id",
+            (session_id,),
+        ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def get_plan(self, session_id: str) -> dict[str, Any] | None:
+        row = self._connect().execute(
+            "SELECT last_access, plan FROM memory_sessions WHERE session_id = ?",
+            (session_id,),
+        ).fetchone()
+        if row is None or row[1] is None:
+            return None
+        if self.ttl_seconds > 0 and time.time() - row[0] >= self.ttl_seconds:
+            return None
+        return json.loads(row[1])
+
+    def set_plan(self, session_id: str, plan: dict[str, Any]) -> None:
+        encoded = json.dumps(plan, ensure_ascii=True)
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            self._update_session(connection, session_id, time.time(), plan=encoded)
+            self._enforce_limits(connection, session_id)
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def stats(self) -> dict[str, Any]:
+        connection = self._connect()
+        sessions, size = connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM memory_sessions"
+        ).fetchone()
+        messages = connection.execute("SELECT COUNT(*) FROM memory_messages").fetchone()[0]
+        evictions = {"lru": 0, "ttl": 0, "bytes": 0}
+        evictions.update(connection.execute("SELECT reason, count FROM memory_evictions").fetchall())
+        return {
+            "backend": "sqlite",
+            "sessions": sessions,
+            "messages": messages,
+            "bytes": size,
+            "evictions": evictions,
+        }
+
+
+def build_memory_backend(max_messages: int) -> MemoryBackend:
+    if settings.memory_backend == "sqlite":
+        return SQLiteMemoryBackend(
+            settings.memory_sqlite_path,
+            max_messages=max_messages,
+            max_sessions=settings.memory_max_sessions,
+            ttl_seconds=settings.memory_session_ttl_seconds,
+            max_bytes=settings.memory_max_bytes,
+        )
+    return InMemoryBackend(
+        max_messages=max_messages,
+        max_sessions=settings.memory_max_sessions,
+        ttl_seconds=settings.memory_session_ttl_seconds,
+        max_bytes=settings.memory_max_bytes,
+    )
+
+
 class ConversationMemory:
-    def __init__(self, max_messages: int | None = None) -> None:
+    def __init__(self, max_messages: int | None = None, backend: MemoryBackend | None = None) -> None:
         self.max_messages = max_messages or settings.memory_max_messages
-        self._store: dict[str, Deque[dict[str, str]]] = defaultdict(
-            lambda: deque(maxlen=self.max_messages)
-        )
+        self.backend = backend or build_memory_backend(self.max_messages)
 
     def add(self, session_id: str, role: str, content: str) -> None:
         if not session_id:
             return
-        self._store[session_id].append({"role": role, "content": content})
+        self.backend.add(session_id, role, content)
 
     def get(self, session_id: str) -> list[dict[str, str]]:
         if not session_id:
             return []
-        return list(self._store.get(session_id, []))
+        return self.backend.get(session_id)
+
+    def get_plan(self, session_id: str) -> dict[str, Any] | None:
+        if not session_id:
+            return None
+        return self.backend.get_plan(session_id)
+
+    def set_plan(self, session_id: str, plan: dict[str, Any]) -> None:
+        if not session_id:
+            return
+        self.backend.set_plan(session_id, plan)
+
+    def stats(self) -> dict[str, Any]:
+        return self.backend.stats()
@@ -2,16 +2,38 @@ from __future__ import annotations
 
 import json
 import re
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, Iterator
+
+from sqlalchemy.exc import SQLAlchemyError
 
 from app.config import settings
-from app.db import run_query
-from app.llm import ollama_client
+from app.db import explain_query, is_statement_error, run_query
+from app.llm import OllamaClient
 from app.memory import ConversationMemory
-from app.prompts import ANSWER_PROMPT, SQL_GENERATION_PROMPT, SYSTEM_PROMPT, TABLE_SELECTION_PROMPT
-from app.rag import LocalVectorStore, VectorDocument
-from app.schema import schema_catalog
+from app.metrics import (
+    CACHE_REQUESTS,
+    MEMORY_BYTES,
+    MEMORY_EVICTIONS,
+    MEMORY_MESSAGES,
+    MEMORY_SESSIONS,
+    STAGE_SECONDS,
+    metrics,
+)
+from app.prompts import (
+    ANSWER_PROMPT,
+    SQL_GENERATION_PROMPT,
+    SQL_REFINE_PROMPT,
+    SQL_REPAIR_PROMPT,
+    SYSTEM_PROMPT,
+    TABLE_SELECTION_PROMPT,
+)
+from app.rag import LocalVectorStore, OllamaEmbedder, VectorDocument
+from app.schema import TableInfo, schema_catalog
+from app.stages import StageGraph
 from app.sql import ensure_limit, strip_trailing_semicolon, validate_sql
 
 
@@ -32,6 +54,15 @@ def _identifier_tokens(name: str) -> set[str]:
     return {part for part in parts if part}
 
 
+_FOLLOWUP_CUES = {"now", "also", "instead"}
+
+_FOLLOWUP_PREFIXES = ("what about", "how about", "same but", "same for", "but only", "and now", "and also")
+
+
+def _stem(tokens: set[str]) -> set[str]:
+    return {token[:-1] if len(token) > 3 and token.endswith("s") else token for token in tokens}
+
+
 def _safe_json(text: str) -> dict[str, Any]:
     cleaned = text.strip()
     if cleaned.startswith("```"):
@@ -47,35 +78,76 @@ def _safe_json(text: str) -> dict[str, Any]:
 
 
 class ChatPipeline:
-    def __init__(self) -> None:
+    def __init__(self, ollama_client: OllamaClient | None = None) -> None:
+        self.ollama_client = ollama_client or OllamaClient()
         self.memory = ConversationMemory()
-        self.rag_store = LocalVectorStore(settings.rag_store_path) if settings.rag_enabled else None
+        self.rag_store = (
+            LocalVectorStore(settings.rag_store_path, embedder=OllamaEmbedder(self.ollama_client))
+            if settings.rag_enabled
+            else None
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(settings.pipeline_workers, settings.sql_candidates * 2),
+            thread_name_prefix="pipeline",
+        )
+        self._token_index: tuple[dict[str, TableInfo], list[tuple[str, set[str], list[set[str]]]]] | None = None
+        metrics.register_collector(self._collect_memory_metrics)
 
-    def _candidate_tables(self, question: str) -> list[str]:
-        catalog = schema_catalog.get()
+    def _collect_memory_metrics(self) -> None:
+        stats = self.memory.stats()
+        MEMORY_SESSIONS.set(stats.get("sessions", 0))
+        MEMORY_MESSAGES.set(stats.get("messages", 0))
+        MEMORY_BYTES.set(stats.get("bytes", 0))
+        for reason, count in stats.get("evictions", {}).items():
+            MEMORY_EVICTIONS.set_total(count, reason=reason)
+
+    def _table_tokens(self, catalog: dict[str, TableInfo]) -> list[tuple[str, set[str], list[set[str]]]]:
+        cached = self._token_index
+        if cached and cached[0] is catalog:
+            CACHE_REQUESTS.inc(cache="table_tokens", result="hit")
+            return cached[1]
+        CACHE_REQUESTS.inc(cache="table_tokens", result="miss")
+        index = [
+            (table, _identifier_tokens(table), [_identifier_tokens(column) for column in info.columns])
+            for table, info in catalog.items()
+        ]
+        self._token_index = (catalog, index)
+        return index
+
+    def _score_tables(self, question: str, catalog: dict[str, TableInfo]) -> list[tuple[str, int]]:
         question_tokens = _tokenize(question)
         scored: list[tuple[str, int]] = []
-        for table, info in catalog.items():
-            table_tokens = _identifier_tokens(table)
+        for table, table_tokens, column_tokens in self._table_tokens(catalog):
             score = len(question_tokens & table_tokens) * 3
-            for column in info.columns:
-                column_tokens = _identifier_tokens(column)
-                score += len(question_tokens & column_tokens)
+            for tokens in column_tokens:
+                score += len(question_tokens & tokens)
             if score > 0:
                 scored.append((table, score))
+        scored.sort(key=lambda pair: pair[1], reverse=True)
+        return scored
+
+    def _candidate_tables(self, question: str, catalog: dict[str, TableInfo] | None = None) -> list[str]:
+        if catalog is None:
+            catalog = schema_catalog.get()
+        scored = self._score_tables(question, catalog)
         if not scored:
             return list(catalog.keys())[: settings.schema_max_candidates]
-        scored.sort(key=lambda pair: pair[1], reverse=True)
         return [table for table, _ in scored[: settings.schema_max_candidates]]
 
-    def _select_tables(self, question: str, candidates: list[str]) -> dict[str, Any]:
-        schema_text = schema_catalog.summarize(candidates)
+    def _select_tables(
+        self,
+        question: str,
+        candidates: list[str],
+        schema_text: str | None = None,
+    ) -> dict[str, Any]:
+        if schema_text is None:
+            schema_text = schema_catalog.summarize(candidates)
         prompt = TABLE_SELECTION_PROMPT.format(question=question, schema=schema_text)
         messages = [
             {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": prompt},
         ]
-        response = ollama_client.chat(messages)
+        response = self.ollama_client.chat(messages)
         payload = _safe_json(response)
         tables = payload.get("tables") or candidates
         tables = [table for table in tables if table in candidates]
@@ -83,35 +155,203 @@ class ChatPipeline:
         notes = payload.get("notes", "")
         return {"tables": tables, "join_path": join_path, "notes": notes, "schema": schema_text}
 
-    def _generate_sql(self, question: str, selection: dict[str, Any]) -> dict[str, Any]:
+    def _generate_sql(
+        self,
+        question: str,
+        selection: dict[str, Any],
+        template: str = SQL_GENERATION_PROMPT,
+        extra: dict[str, str] | None = None,
+        temperature: float | None = None,
+    ) -> dict[str, Any]:
         schema_text = selection["schema"]
         tables = selection["tables"]
         join_path = selection.get("join_path", [])
-        prompt = SQL_GENERATION_PROMPT.format(
+        prompt = template.format(
             question=question,
             tables=", ".join(tables),
             schema=schema_text,
             join_path="\n".join(join_path) if join_path else "(none)",
             limit=settings.max_result_rows,
+            **(extra or {}),
         )
         messages = [
             {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": prompt},
         ]
-        response = ollama_client.chat(messages)
+        response = self.ollama_client.chat(messages, temperature=temperature)
         payload = _safe_json(response)
         sql = payload.get("sql", "").strip()
         if sql:
             sql = ensure_limit(strip_trailing_semicolon(sql), settings.max_result_rows)
         return {"sql": sql, "notes": payload.get("notes", ""), "raw": response}
 
-    def _build_context(self, question: str) -> str:
+    def _check_sql(self, sql: str, tables: list[str]) -> str:
+        if not sql:
+            return "No SQL was generated."
+        with STAGE_SECONDS.time(stage="validate_sql"):
+            valid, error = validate_sql(sql, tables)
+        if not valid:
+            return error
+        if settings.sql_dry_run:
+            try:
+                with STAGE_SECONDS.time(stage="explain_sql"):
+                    explain_query(sql)
+            except SQLAlchemyError as exc:
+                if not is_statement_error(exc):
+                    raise
+                return f"EXPLAIN failed: {exc}"
+        return ""
+
+    def _checked_sql(
+        self,
+        question: str,
+        selection: dict[str, Any],
+        template: str = SQL_GENERATION_PROMPT,
+        extra: dict[str, str] | None = None,
+        temperature: float | None = None,
+    ) -> dict[str, Any]:
+        payload = self._generate_sql(question, selection, template=template, extra=extra, temperature=temperature)
+        payload["error"] = self._check_sql(payload["sql"], selection["tables"])
+        return payload
+
+    @staticmethod
+    def _timeout_error() -> TimeoutError:
+        return TimeoutError(f"SQL generation exceeded {settings.sql_generation_timeout_seconds:g} seconds.")
+
+    @classmethod
+    def _remaining(cls, deadline: float) -> float:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise cls._timeout_error()
+        return remaining
+
+    def _plan_sql(
+        self,
+        question: str,
+        selection: dict[str, Any],
+        attempts: dict[str, int],
+        errors: list[str],
+        deadline: float,
+    ) -> dict[str, Any]:
+        pending: set[Future] = set()
+        for idx in range(settings.sql_candidates):
+            temperature = settings.sql_candidate_temperature if idx > 0 else None
+            pending.add(self.executor.submit(self._checked_sql, question, selection, temperature=temperature))
+        attempts["sql_generation"] += len(pending)
+
+        failed: dict[str, Any] | None = None
+        first_exc: Exception | None = None
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=self._remaining(deadline), return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        payload = future.result()
+                    except Exception as exc:
+                        errors.append(str(exc))
+                        first_exc = first_exc or exc
+                        continue
+                    if not payload["error"]:
+                        return payload
+                    errors.append(payload["error"])
+                    failed = payload
+        finally:
+            for future in pending:
+                future.cancel()
+        if failed is None:
+            raise first_exc or ValueError("No SQL was generated.")
+        return self._repair_sql(question, selection, failed, attempts, errors, deadline)
+
+    def _repair_sql(
+        self,
+        question: str,
+        selection: dict[str, Any],
+        failed: dict[str, Any],
+        attempts: dict[str, int],
+        errors: list[str],
+        deadline: float,
+    ) -> dict[str, Any]:
+        while attempts["sql_repair"] < settings.sql_repair_attempts:
+            attempts["sql_repair"] += 1
+            extra = {"sql": failed.get("sql") or "(empty)", "error": failed.get("error", "")}
+            future = self.executor.submit(
+                self._checked_sql, question, selection, template=SQL_REPAIR_PROMPT, extra=extra
+            )
+            try:
+                payload = future.result(timeout=self._remaining(deadline))
+            except TimeoutError:
+                future.cancel()
+                raise self._timeout_error() from None
+            if not payload["error"]:
+                return payload
+            errors.append(payload["error"])
+            failed = payload
+        raise ValueError(failed["error"])
+
+    def _is_refinement(
+        self,
+        question: str,
+        previous: dict[str, Any],
+        catalog: dict[str, TableInfo],
+    ) -> bool:
+        words = question.strip().lower().split()
+        if not words or len(words) > settings.followup_max_words:
+            return False
+        lowered = " ".join(words)
+        first = re.sub(r"\W+", "", words[0])
+        if first not in _FOLLOWUP_CUES and not lowered.startswith(_FOLLOWUP_PREFIXES):
+            return False
+        planned = set(previous.get("tables", []))
+        question_tokens = _stem(_tokenize(question))
+        for table, table_tokens, _ in self._table_tokens(catalog):
+            if table not in planned and question_tokens & _stem(table_tokens):
+                return False
+        best_planned = best_unplanned = 0
+        for table, score in self._score_tables(question, catalog):
+            if table in planned:
+                best_planned = max(best_planned, score)
+            else:
+                best_unplanned = max(best_unplanned, score)
+        return best_unplanned <= best_planned
+
+    def _refine_sql(
+        self,
+        question: str,
+        previous: dict[str, Any],
+        selection: dict[str, Any],
+        attempts: dict[str, int],
+        errors: list[str],
+        deadline: float,
+    ) -> dict[str, Any] | None:
+        attempts["sql_refine"] += 1
+        extra = {"previous_question": previous.get("question", ""), "previous_sql": previous.get("sql", "")}
+        future = self.executor.submit(
+            self._checked_sql, question, selection, template=SQL_REFINE_PROMPT, extra=extra
+        )
+        try:
+            payload = future.result(timeout=self._remaining(deadline))
+        except TimeoutError:
+            future.cancel()
+            errors.append(str(self._timeout_error()))
+            return None
+        if payload["error"]:
+            errors.append(payload["error"])
+            return None
+        return payload
+
+    def _build_context(self, question: str, query_embedding: list[float] | None = None) -> str:
         if not self.rag_store:
             return ""
-        results = self.rag_store.search(question, settings.rag_top_k)
+        if query_embedding is not None:
+            results = self.rag_store.search_by_embedding(query_embedding, settings.rag_top_k)
+        else:
+            results = self.rag_store.search(question, settings.rag_top_k)
         lines = [f"- {item.text}" for item in results]
         return "\n".join(lines)
 
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
     def ingest_document(self, doc_id: str, text: str, metadata: dict[str, Any] | None = None) -> None:
         if not self.rag_store:
             return
@@ -123,18 +363,62 @@ class ChatPipeline:
         ]
         self.rag_store.add(documents)
 
-    def run(self, question: str, session_id: str | None = None) -> ChatResult:
-        candidates = self._candidate_tables(question)
-        selection = self._select_tables(question, candidates)
-        sql_payload = self._generate_sql(question, selection)
-        sql = sql_payload.get("sql", "")
+    def run(
+        self,
+        question: str,
+        session_id: str | None = None,
+        query_embedding: list[float] | None = None,
+        catalog: dict[str, TableInfo] | None = None,
+    ) -> ChatResult:
+        graph = StageGraph(self.executor)
+        attempts = {"sql_refine": 0, "sql_generation": 0, "sql_repair": 0, "db_execution": 0}
+        errors: list[str] = []
+        sql_payload: dict[str, Any] | None = None
+        fast_path = False
 
-        valid, error = validate_sql(sql, selection["tables"])
-        if not valid:
-            raise ValueError(error)
+        # RAG retrieval only depends on the question, so it runs off the critical path.
+        graph.spawn("rag_context", self._build_context, question, query_embedding)
+        if catalog is None:
+            catalog = schema_catalog.get()
+
+        previous = self.memory.get_plan(session_id) if settings.followup_fast_path and session_id else None
+        if previous and self._is_refinement(question, previous, catalog):
+            candidates = list(previous.get("tables", []))
+            selection = {
+                "tables": candidates,
+                "join_path": previous.get("join_path", []),
+                "notes": "Reused from the previous turn.",
+                "schema": previous.get("schema", ""),
+            }
+            deadline = time.monotonic() + settings.sql_generation_timeout_seconds
+            sql_payload = graph.run(
+                "refine_sql", self._refine_sql, question, previous, selection, attempts, errors, deadline
+            )
+            fast_path = sql_payload is not None
 
-        data = run_query(sql)
-        context = self._build_context(question)
+        if sql_payload is None:
+            candidates = graph.run("candidate_tables", self._candidate_tables, question, catalog)
+            schema_text = graph.run("schema_snippet", schema_catalog.summarize, candidates, catalog)
+            selection = graph.run("select_tables", self._select_tables, question, candidates, schema_text)
+            deadline = time.monotonic() + settings.sql_generation_timeout_seconds
+            sql_payload = graph.run(
+                "generate_sql", self._plan_sql, question, selection, attempts, errors, deadline
+            )
+        while True:
+            sql = sql_payload["sql"]
+            attempts["db_execution"] += 1
+            try:
+                data = graph.run("run_query", run_query, sql)
+                break
+            except SQLAlchemyError as exc:
+                if not is_statement_error(exc) or attempts["sql_repair"] >= settings.sql_repair_attempts:
+                    raise
+                errors.append(str(exc))
+                failed = {**sql_payload, "error": str(exc)}
+                sql_payload = graph.run(
+                    "repair_sql", self._repair_sql, question, selection, failed, attempts, errors, deadline
+                )
+        context = graph.result("rag_context")
 
         answer_prompt = ANSWER_PROMPT.format(
             question=question,
@@ -146,19 +430,73 @@ class ChatPipeline:
             {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": answer_prompt},
         ]
-        response = ollama_client.chat(messages)
+        response = graph.run("answer", self.ollama_client.chat, messages)
 
         if session_id:
             self.memory.add(session_id, "user", question)
             self.memory.add(session_id, "assistant", response)
+            self.memory.set_plan(
+                session_id,
+                {
+                    "question": question,
+                    "tables": selection["tables"],
+                    "join_path": selection.get("join_path", []),
+                    "schema": selection["schema"],
+                    "sql": sql,
+                },
+            )
 
         debug = {
             "candidates": candidates,
             "selection": selection,
             "sql_notes": sql_payload.get("notes"),
             "sql_raw": sql_payload.get("raw"),
+            "fast_path": fast_path,
+            "attempts": attempts,
+            "sql_errors": errors,
+            "timeline": graph.timeline(),
         }
         return ChatResult(answer=response, sql=sql, data=data, debug=debug)
 
+    def run_batch(
+        self,
+        questions: list[str],
+        concurrency: int | None = None,
+    ) -> Iterator[tuple[int, ChatResult | None, str | None]]:
+        concurrency = max(1, min(concurrency or settings.batch_concurrency, settings.batch_max_concurrency))
+        positions: dict[str, list[int]] = defaultdict(list)
+        for index, question in enumerate(questions):
+            positions[question].append(index)
+        unique = list(positions)
+
+        catalog: dict[str, TableInfo] | None = None
+        try:
+            catalog = schema_catalog.get()
+        except Exception:
+            catalog = None
+        embeddings: dict[str, list[float]] = {}
+        if self.rag_store:
+            try:
+                embeddings = dict(zip(unique, self.rag_store.embedder.embed_many(unique)))
+            except Exception:
+                embeddings = {}
 
-pipeline = ChatPipeline()
+        executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch")
+        try:
+            futures = {
+                executor.submit(
+                    self.run, question, query_embedding=embeddings.get(question), catalog=catalog
+                ): question
+                for question in unique
+            }
+            for future in as_completed(futures):
+                try:
+                    result, error = future.result(), None
+                except Exception as exc:
+                    result, error = None, str(exc)
+                for index in positions[futures[future]]:
+                    yield index, result, error
+        except GeneratorExit:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
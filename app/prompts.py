@@ -54,3 +54,54 @@ SQL results:
 Context:
 {context}
 """.strip()
+
+SQL_REPAIR_PROMPT = """
+The previous SQL statement failed. Fix it so it answers the question.
+Rules:
+- Use only these tables: {tables}
+- Use only columns shown in the schema.
+- Keep it a single read-only SELECT statement.
+- Add LIMIT {limit} unless it is already present.
+- Output JSON only with keys: sql, notes
+
+User question:
+{question}
+
+Schema:
+{schema}
+
+Join paths:
+{join_path}
+
+Previous SQL:
+{sql}
+
+Error:
+{error}
+""".strip()
+
+SQL_REFINE_PROMPT = """
+The user is refining their previous question. Modify the previous SQL statement
+so it answers the follow-up question.
+Rules:
+- Use only these tables: {tables}
+- Use only columns shown in the schema.
+- Keep it a single read-only SELECT statement.
+- Add LIMIT {limit} unless it is already present.
+- Output JSON only with keys: sql, notes
+
+Previous question:
+{previous_question}
+
+Previous SQL:
+{previous_sql}
+
+Follow-up question:
+{question}
+
+Schema:
+{schema}
+
+Join paths:
+{join_path}
+""".strip()
@@ -25,3 +25,6 @@ class VectorStore(Protocol):
 
     def search(self, query: str, top_k: int) -> list[VectorResult]:
         raise NotImplementedError
+
+    def search_by_embedding(self, query_embedding: list[float], top_k: int) -> list[VectorResult]:
+        raise NotImplementedError
@@ -2,14 +2,23 @@ from __future__ import annotations
 
 from typing import Protocol
 
-from app.llm import ollama_client
+from app.llm import OllamaClient
 
 
 class Embedder(Protocol):
     def embed(self, text: str) -> list[float]:
         raise NotImplementedError
 
+    def embed_many(self, texts: list[str]) -> list[list[float]]:
+        raise NotImplementedError
+
 
 class OllamaEmbedder:
+    def __init__(self, client: OllamaClient | None = None) -> None:
+        self.client = client or OllamaClient()
+
     def embed(self, text: str) -> list[float]:
-        return ollama_client.embed(text)
+        return self.client.embed(text)
+
+    def embed_many(self, texts: list[str]) -> list[list[float]]:
+        return self.client.embed_many(texts)
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import json
 import math
+import threading
 from pathlib import Path
 from typing import Any, Iterable
 
@@ -24,24 +25,35 @@ class LocalVectorStore:
     def __init__(self, path: str, embedder: Embedder | None = None) -> None:
         self.path = Path(path)
         self.embedder = embedder or OllamaEmbedder()
-        self._data: list[dict[str, Any]] = []
-        self._load()
+        self._data: list[dict[str, Any]] | None = None
+        self._lock = threading.Lock()
 
-    def _load(self) -> None:
+    @property
+    def loaded(self) -> bool:
+        return self._data is not None
+
+    def load(self) -> list[dict[str, Any]]:
+        if self._data is not None:
+            return self._data
+        with self._lock:
+            if self._data is None:
+                self._data = self._read()
+        return self._data
+
+    def _read(self) -> list[dict[str, Any]]:
         if not self.path.exists():
-            self._data = []
-            return
+            return []
         try:
-            self._data = json.loads(self.path.read_text())
+            return json.loads(self.path.read_text())
         except json.JSONDecodeError:
-            self._data = []
+            return []
 
     def _persist(self) -> None:
         self.path.parent.mkdir(parents=True, exist_ok=True)
         self.path.write_text(json.dumps(self._data, indent=2))
 
     def add(self, documents: Iterable[VectorDocument]) -> None:
-        existing = {item["doc_id"]: item for item in self._data if "doc_id" in item}
+        existing = {item["doc_id"]: item for item in self.load() if "doc_id" in item}
         for doc in documents:
             embedding = self.embedder.embed(doc.text)
             existing[doc.doc_id] = {
@@ -54,9 +66,11 @@ class LocalVectorStore:
         self._persist()
 
     def search(self, query: str, top_k: int) -> list[VectorResult]:
-        query_embedding = self.embedder.embed(query)
+        return self.search_by_embedding(self.embedder.embed(query), top_k)
+
+    def search_by_embedding(self, query_embedding: list[float], top_k: int) -> list[VectorResult]:
         scored: list[VectorResult] = []
-        for item in self._data:
+        for item in self.load():
             score = _cosine_similarity(query_embedding, item.get("embedding", []))
             scored.append(
                 VectorResult(
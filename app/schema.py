@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import threading
 import time
 from dataclasses import dataclass
 from typing import Any
@@ -8,6 +9,7 @@ from sqlalchemy import inspect
 
 from app.config import settings
 from app.db import get_engine
+from app.metrics import CACHE_REQUESTS, SCHEMA_REFRESH_SECONDS, SCHEMA_TABLES
 
 
 @dataclass
@@ -21,6 +23,7 @@ class SchemaCatalog:
     def __init__(self) -> None:
         self._cache: dict[str, Any] | None = None
         self._loaded_at: float = 0.0
+        self._refresh_lock = threading.Lock()
 
     def _is_cache_valid(self) -> bool:
         if not self._cache:
@@ -28,6 +31,7 @@ class SchemaCatalog:
         return (time.time() - self._loaded_at) < settings.schema_cache_ttl_seconds
 
     def refresh(self) -> dict[str, TableInfo]:
+        started = time.perf_counter()
         inspector = inspect(get_engine())
         tables = inspector.get_table_names(schema=settings.db_schema)
         tables = self._filter_tables(tables)
@@ -60,15 +64,24 @@ class SchemaCatalog:
 
         self._cache = catalog
         self._loaded_at = time.time()
+        SCHEMA_REFRESH_SECONDS.observe(time.perf_counter() - started)
+        SCHEMA_TABLES.set(len(catalog))
         return catalog
 
     def get(self) -> dict[str, TableInfo]:
         if self._is_cache_valid():
+            CACHE_REQUESTS.inc(cache="schema", result="hit")
             return self._cache or {}
-        return self.refresh()
-
-    def summarize(self, tables: list[str]) -> str:
-        catalog = self.get()
+        with self._refresh_lock:
+            if self._is_cache_valid():
+                CACHE_REQUESTS.inc(cache="schema", result="hit")
+                return self._cache or {}
+            CACHE_REQUESTS.inc(cache="schema", result="miss")
+            return self.refresh()
+
+    def summarize(self, tables: list[str], catalog: dict[str, TableInfo] | None = None) -> str:
+        if catalog is None:
+            catalog = self.get()
         lines: list[str] = []
         for table in tables:
             info = catalog.get(table)
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from app.metrics import STAGE_SECONDS
+
+
+class StageGraph:
+    def __init__(self, executor: Executor) -> None:
+        self.executor = executor
+        self._origin = time.perf_counter()
+        self._futures: dict[str, Future] = {}
+        self._timeline: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def _record(self, name: str, started: float, ended: float, ok: bool) -> None:
+        STAGE_SECONDS.observe(ended - started, stage=name)
+        entry = {
+            "stage": name,
+            "start_ms": round((started - self._origin) * 1000, 2),
+            "duration_ms": round((ended - started) * 1000, 2),
+            "thread": threading.current_thread().name,
+            "ok": ok,
+        }
+        with self._lock:
+            self._timeline.append(entry)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self._record(name, started, time.perf_counter(), ok)
+
+    def run(self, name: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        with self.stage(name):
+            return fn(*args, **kwargs)
+
+    def spawn(self, name: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        future = self.executor.submit(self.run, name, fn, *args, **kwargs)
+        self._futures[name] = future
+        return future
+
+    def result(self, name: str, timeout: float | None = None) -> Any:
+        future = self._futures[name]
+        started = time.perf_counter()
+        ok = False
+        try:
+            value = future.result(timeout=timeout)
+            ok = True
+            return value
+        finally:
+            ended = time.perf_counter()
+            if ended - started > 0.001:
+                self._record(f"wait:{name}", started, ended, ok)
+
+    def timeline(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return sorted(self._timeline, key=lambda entry: entry["start_ms"])
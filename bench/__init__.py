@@ -0,0 +1 @@
+"""Offline benchmarks for the DB-aware chat backend."""
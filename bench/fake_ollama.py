@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+_SCHEMA_LINE = re.compile(r"^- (\w+)\(([^)]*)\)", re.MULTILINE)
+_TABLES_LINE = re.compile(r"Use only these tables: (.+)")
+_FK_LINE = re.compile(r"^  - fk: (\S+ -> \S+)", re.MULTILINE)
+_LIMIT_LINE = re.compile(r"Add LIMIT (\d+)")
+
+
+def _embedding(text: str, dimensions: int) -> list[float]:
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    values = [((digest[idx % len(digest)] + idx * 31) % 251) / 125.0 - 1.0 for idx in range(dimensions)]
+    norm = math.sqrt(sum(value * value for value in values)) or 1.0
+    return [value / norm for value in values]
+
+
+def _schema_tables(prompt: str) -> list[tuple[str, list[str]]]:
+    return [
+        (name, [column.strip() for column in columns.split(",") if column.strip()])
+        for name, columns in _SCHEMA_LINE.findall(prompt)
+    ]
+
+
+def canned_reply(prompt: str) -> str:
+    schema = _schema_tables(prompt)
+    if "choose the minimum set of tables" in prompt:
+        tables = [name for name, _ in schema[:2]]
+        join_path = [path for path in _FK_LINE.findall(prompt) if all(name in path for name in tables)]
+        return json.dumps({"tables": tables, "join_path": join_path[:1], "notes": "fake selection"})
+    if "SQL" in prompt and "Output JSON only with keys: sql, notes" in prompt:
+        allowed = _TABLES_LINE.search(prompt)
+        names = [name.strip() for name in allowed.group(1).split(",")] if allowed else []
+        columns = dict(schema)
+        table = next((name for name in names if name in columns), names[0] if names else "")
+        selected = ", ".join(columns.get(table, ["*"])[:3]) or "*"
+        match = _LIMIT_LINE.search(prompt)
+        limit = match.group(1) if match else "50"
+        return json.dumps({"sql": f"SELECT {selected} FROM {table} LIMIT {limit}", "notes": "fake sql"})
+    return "There are several matching rows; see the SQL results for details."
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    server: "FakeOllamaServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        return
+
+    def _read_json(self) -> dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b"{}"
+        try:
+            return json.loads(body)
+        except json.JSONDecodeError:
+            return {}
+
+    def _send_json(self, payload: dict[str, Any], status: int = 200) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, model: str, prompt: str, content: str, key: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        words = content.split(" ")
+        for idx, word in enumerate(words):
+            piece = word if idx == 0 else f" {word}"
+            chunk = {"model": model, "done": False}
+            chunk[key] = {"role": "assistant", "content": piece} if key == "message" else piece
+            self.wfile.write((json.dumps(chunk) + "\n").encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(self.server.token_latency)
+        final = {"model": model, "done": True, **self.server.eval_stats(prompt, content)}
+        final[key] = {"role": "assistant", "content": ""} if key == "message" else ""
+        self.wfile.write((json.dumps(final) + "\n").encode("utf-8"))
+
+    def do_GET(self) -> None:
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": self.server.chat_model}, {"name": self.server.embedding_model}]})
+            return
+        self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self) -> None:
+        payload = self._read_json()
+        model = payload.get("model", "")
+        self.server.record(self.path)
+        if self.path == "/api/chat":
+            messages = payload.get("messages") or []
+            prompt = "\n".join(message.get("content", "") for message in messages)
+            if not messages:
+                self._send_json({"model": model, "message": {"role": "assistant", "content": ""}, "done": True})
+                return
+            time.sleep(self.server.chat_latency)
+            content = canned_reply(prompt)
+            if payload.get("stream", True):
+                self._stream(model, prompt, content, "message")
+                return
+            self._send_json(
+                {
+                    "model": model,
+                    "message": {"role": "assistant", "content": content},
+                    "done": True,
+                    **self.server.eval_stats(prompt, content),
+                }
+            )
+            return
+        if self.path == "/api/generate":
+            prompt = payload.get("prompt", "")
+            if not prompt:
+                self._send_json({"model": model, "response": "", "done": True})
+                return
+            time.sleep(self.server.chat_latency)
+            content = canned_reply(prompt)
+            if payload.get("stream", True):
+                self._stream(model, prompt, content, "response")
+                return
+            self._send_json(
+                {"model": model, "response": content, "done": True, **self.server.eval_stats(prompt, content)}
+            )
+            return
+        if self.path == "/api/embeddings":
+            time.sleep(self.server.embed_latency)
+            self._send_json({"embedding": _embedding(payload.get("prompt", ""), self.server.dimensions)})
+            return
+        if self.path == "/api/embed":
+            inputs = payload.get("input") or []
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            time.sleep(self.server.embed_latency)
+            self._send_json(
+                {"model": model, "embeddings": [_embedding(text, self.server.dimensions) for text in inputs]}
+            )
+            return
+        self._send_json({"error": "not found"}, status=404)
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        chat_latency: float = 0.05,
+        embed_latency: float = 0.005,
+        token_latency: float = 0.0,
+        dimensions: int = 64,
+        chat_model: str = "llama3.1",
+        embedding_model: str = "nomic-embed-text",
+    ) -> None:
+        super().__init__((host, port), FakeOllamaHandler)
+        self.chat_latency = chat_latency
+        self.embed_latency = embed_latency
+        self.token_latency = token_latency
+        self.dimensions = dimensions
+        self.chat_model = chat_model
+        self.embedding_model = embedding_model
+        self.requests: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, path: str) -> None:
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def eval_stats(self, prompt: str, content: str) -> dict[str, int]:
+        tokens = max(1, len(content.split()))
+        return {
+            "prompt_eval_count": max(1, len(prompt) // 4),
+            "prompt_eval_duration": int(self.chat_latency * 0.2 * 1e9),
+            "eval_count": tokens,
+            "eval_duration": int(self.chat_latency * 0.8 * 1e9),
+        }
+
+    def start(self) -> "FakeOllamaServer":
+        threading.Thread(target=self.serve_forever, name="fake-ollama", daemon=True).start()
+        return self
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake Ollama server for offline benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--chat-latency-ms", type=float, default=50.0)
+    parser.add_argument("--embed-latency-ms", type=float, default=5.0)
+    parser.add_argument("--token-latency-ms", type=float, default=0.0)
+    parser.add_argument("--dimensions", type=int, default=64)
+    args = parser.parse_args()
+    server = FakeOllamaServer(
+        host=args.host,
+        port=args.port,
+        chat_latency=args.chat_latency_ms / 1000,
+        embed_latency=args.embed_latency_ms / 1000,
+        token_latency=args.token_latency_ms / 1000,
+        dimensions=args.dimensions,
+    )
+    print(f"Fake Ollama listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import socket
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable
+
+import requests
+
+from bench.fake_ollama import FakeOllamaServer
+from bench.warehouse import STATUSES, build_warehouse
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def summarize(name: str, concurrency: int, samples: list[float], errors: int, wall: float) -> dict[str, Any]:
+    return {
+        "name": name,
+        "concurrency": concurrency,
+        "count": len(samples),
+        "errors": errors,
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        "rps": round(len(samples) / wall, 2) if wall > 0 else 0.0,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _configure_environment(args: argparse.Namespace, workdir: Path, ollama_url: str) -> None:
+    os.environ.update(
+        {
+            "DB_URL": f"sqlite:///{workdir / 'warehouse.db'}",
+            "DB_SCHEMA": "main",
+            "SCHEMA_MAX_TABLES": str(args.tables),
+            "OLLAMA_BASE_URL": ollama_url,
+            "RAG_ENABLED": "true",
+            "RAG_STORE_PATH": str(workdir / "rag_store.json"),
+            "MEMORY_BACKEND": "memory",
+            "METRICS_ENABLED": "true",
+        }
+    )
+
+
+def _start_api(port: int) -> Any:
+    import uvicorn
+
+    from app.main import app
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, name="bench-api", daemon=True).start()
+    deadline = time.monotonic() + 30
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("API server did not start.")
+        time.sleep(0.05)
+    return server
+
+
+def drive(
+    call: Callable[[int], dict[str, Any] | None],
+    total: int,
+    concurrency: int,
+) -> tuple[list[float], list[dict[str, Any]], int, float]:
+    latencies: list[float] = []
+    payloads: list[dict[str, Any]] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker(idx: int) -> None:
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            payload = call(idx)
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if payload:
+                payloads.append(payload)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(total)))
+    return latencies, payloads, errors, time.perf_counter() - started
+
+
+def bench_schema_refresh(total: int, concurrency: int) -> dict[str, Any]:
+    from app.schema import schema_catalog
+
+    def call(idx: int) -> None:
+        schema_catalog.refresh()
+
+    latencies, _, errors, wall = drive(call, total, concurrency)
+    return summarize("schema_refresh", concurrency, latencies, errors, wall)
+
+
+def bench_ingest(base_url: str, total: int, concurrency: int, session: requests.Session) -> dict[str, Any]:
+    def call(idx: int) -> None:
+        response = session.post(
+            f"{base_url}/rag/ingest",
+            json={"doc_id": f"doc-{concurrency}-{idx}", "text": f"Glossary entry {idx}: amount is in USD. " * 20},
+            timeout=120,
+        )
+        response.raise_for_status()
+
+    latencies, _, errors, wall = drive(call, total, concurrency)
+    return summarize("rag_ingest", concurrency, latencies, errors, wall)
+
+
+def bench_chat(
+    base_url: str,
+    tables: list[str],
+    total: int,
+    concurrency: int,
+    session: requests.Session,
+) -> list[dict[str, Any]]:
+    def call(idx: int) -> dict[str, Any]:
+        table = tables[idx % len(tables)]
+        question = f"How many {table} are {STATUSES[idx % len(STATUSES)]} by region?"
+        response = session.post(
+            f"{base_url}/chat",
+            json={"question": question, "include_debug": True},
+            timeout=300,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    latencies, payloads, errors, wall = drive(call, total, concurrency)
+    rows = [summarize("chat", concurrency, latencies, errors, wall)]
+    stages: dict[str, list[float]] = defaultdict(list)
+    for payload in payloads:
+        for entry in (payload.get("debug") or {}).get("timeline", []):
+            stages[entry["stage"]].append(entry["duration_ms"] / 1000)
+    for stage, samples in sorted(stages.items()):
+        rows.append(summarize(f"chat.{stage}", concurrency, samples, 0, wall))
+    return rows
+
+
+def print_report(rows: list[dict[str, Any]]) -> None:
+    header = f"{'benchmark':<32} {'conc':>5} {'count':>6} {'err':>4} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'rps':>9}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(
+            f"{row['name']:<32} {row['concurrency']:>5} {row['count']:>6} {row['errors']:>4} "
+            f"{row['p50_ms']:>10.2f} {row['p95_ms']:>10.2f} {row['p99_ms']:>10.2f} {row['rps']:>9.2f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark with a fake Ollama.")
+    parser.add_argument("--tables", type=int, default=200)
+    parser.add_argument("--rows-per-table", type=int, default=1000)
+    parser.add_argument("--chain-length", type=int, default=4)
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels.")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per concurrency level.")
+    parser.add_argument("--schema-refreshes", type=int, default=5, help="Schema refreshes per concurrency level.")
+    parser.add_argument("--chat-latency-ms", type=float, default=50.0)
+    parser.add_argument("--embed-latency-ms", type=float, default=5.0)
+    parser.add_argument("--skip-ingest", action="store_true")
+    parser.add_argument("--workdir", default=None, help="Directory for the warehouse and RAG store.")
+    parser.add_argument("--json", dest="json_path", default=None, help="Write results to this JSON file.")
+    args = parser.parse_args()
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="dbai-bench-"))
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+
+    tick = time.perf_counter()
+    tables = build_warehouse(
+        str(workdir / "warehouse.db"),
+        tables=args.tables,
+        rows_per_table=args.rows_per_table,
+        chain_length=args.chain_length,
+    )
+    print(f"Built {len(tables)} tables in {time.perf_counter() - tick:.1f}s at {workdir}")
+
+    ollama = FakeOllamaServer(
+        chat_latency=args.chat_latency_ms / 1000,
+        embed_latency=args.embed_latency_ms / 1000,
+    ).start()
+    _configure_environment(args, workdir, ollama.base_url)
+    port = _free_port()
+    api = _start_api(port)
+    base_url = f"http://127.0.0.1:{port}"
+
+    rows: list[dict[str, Any]] = []
+    with requests.Session() as session:
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(levels))
+        session.mount("http://", adapter)
+        for level in levels:
+            rows.append(bench_schema_refresh(args.schema_refreshes, level))
+            if not args.skip_ingest:
+                rows.append(bench_ingest(base_url, args.requests, level, session))
+            rows.extend(bench_chat(base_url, tables, args.requests, level, session))
+
+    api.should_exit = True
+    ollama.shutdown()
+    print_report(rows)
+    print(f"Fake Ollama requests: {json.dumps(ollama.requests, sort_keys=True)}")
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import argparse
+import random
+import sqlite3
+from pathlib import Path
+
+NOUNS = [
+    "customers", "orders", "products", "invoices", "payments", "shipments", "suppliers", "stores",
+    "employees", "regions", "returns", "campaigns", "coupons", "inventory", "warehouses", "carriers",
+]
+STATUSES = ["open", "closed", "pending", "cancelled"]
+REGIONS = ["north", "south", "east", "west"]
+
+
+def table_names(count: int) -> list[str]:
+    return [f"{NOUNS[idx % len(NOUNS)]}_{idx}" for idx in range(count)]
+
+
+def build_warehouse(
+    path: str,
+    tables: int = 200,
+    rows_per_table: int = 1000,
+    chain_length: int = 4,
+    seed: int = 7,
+    batch_size: int = 10000,
+) -> list[str]:
+    target = Path(path)
+    if target.exists():
+        target.unlink()
+    target.parent.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    names = table_names(tables)
+    connection = sqlite3.connect(target)
+    connection.execute("PRAGMA journal_mode=OFF")
+    connection.execute("PRAGMA synchronous=OFF")
+    try:
+        for idx, name in enumerate(names):
+            parent = names[idx - 1] if idx % chain_length else None
+            parent_column = f"{parent}_id INTEGER REFERENCES {parent}(id), " if parent else ""
+            connection.execute(
+                f"CREATE TABLE {name} (id INTEGER PRIMARY KEY, {parent_column}"
+                "name TEXT, amount REAL, status TEXT, region TEXT, created_at TEXT)"
+            )
+            insert = (
+                f"INSERT INTO {name} VALUES (?, {'?, ' if parent else ''}?, ?, ?, ?, ?)"
+            )
+            for start in range(0, rows_per_table, batch_size):
+                batch = []
+                for row_id in range(start + 1, min(start + batch_size, rows_per_table) + 1):
+                    row = [row_id]
+                    if parent:
+                        row.append(rng.randint(1, max(rows_per_table, 1)))
+                    row.extend(
+                        [
+                            f"{name}-{row_id}",
+                            round(rng.uniform(1, 1000), 2),
+                            rng.choice(STATUSES),
+                            rng.choice(REGIONS),
+                            f"202{rng.randint(3, 5)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                        ]
+                    )
+                    batch.append(row)
+                connection.executemany(insert, batch)
+            connection.commit()
+    finally:
+        connection.close()
+    return names
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic SQLite warehouse.")
+    parser.add_argument("path")
+    parser.add_argument("--tables", type=int, default=200)
+    parser.add_argument("--rows-per-table", type=int, default=1000)
+    parser.add_argument("--chain-length", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    names = build_warehouse(
+        args.path,
+        tables=args.tables,
+        rows_per_table=args.rows_per_table,
+        chain_length=args.chain_length,
+        seed=args.seed,
+    )
+    print(f"Wrote {len(names)} tables to {args.path}")
+
+
+if __name__ == "__main__":
+    main()